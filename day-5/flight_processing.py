@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Server-side flight-state processing for the Homecoming Board proxy
+
+useFlightData.ts used to turn every OpenSky `states` row into a
+ProcessedFlight in the browser on each refetch. This module does that work
+once per upstream refresh, for every board at once:
+
+- FlightColumns: state vectors loaded into NumPy columns (NaN = null)
+- GridIndex: a uniform lat/lon grid for bbox and radius queries, so a board
+  only ever touches the flights near its airport
+- arrival_info: distance, ETA and status for any number of flights in one
+  vectorized pass
+- BoardFeed: per-board, pre-filtered flight lists, delta-encoded against the
+  version the board already has
+
+flight_proxy.py mounts this at /api/boards/{airport}/flights.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from aiohttp import web
+
+EARTH_RADIUS_KM = 6371.0
+
+# Airborne flights descending within this range and this angle of the bearing
+# to the airport are "arriving"
+ARRIVAL_HEADING_DEG = 60.0
+ARRIVAL_RADIUS_KM = 200.0
+# Airborne flights climbing away from the airport within this range are "departed"
+DEPARTURE_RADIUS_KM = 30.0
+
+DEFAULT_RADIUS_KM = 50.0
+
+# Status codes; STATUS_NAMES[code] matches ProcessedFlight['status']
+IN_AIR, ON_GROUND, ARRIVING, DEPARTED = range(4)
+STATUS_NAMES = ["in-air", "on-ground", "arriving", "departed"]
+
+# Snapshots kept per board feed; boards further behind get a full list
+FEED_HISTORY = 4
+# Board feeds not requested for this long are dropped, and at most MAX_FEEDS
+# are kept; every distinct bbox/radius a client sends creates one
+FEED_IDLE_SECONDS = 600.0
+MAX_FEEDS = 256
+
+
+@dataclass(frozen=True)
+class Airport:
+    code: str
+    lat: float
+    lon: float
+
+
+AIRPORTS: Dict[str, Airport] = {
+    airport.code: airport
+    for airport in [
+        Airport("JFK", 40.6413, -73.7781),
+        Airport("LGA", 40.7769, -73.8740),
+        Airport("EWR", 40.6895, -74.1745),
+        Airport("BOS", 42.3656, -71.0096),
+        Airport("ORD", 41.9742, -87.9073),
+        Airport("ATL", 33.6407, -84.4277),
+        Airport("LAX", 33.9416, -118.4085),
+        Airport("SFO", 37.6213, -122.3790),
+    ]
+}
+
+
+@dataclass
+class FlightColumns:
+    """OpenSky state vectors as parallel NumPy columns, one row per flight"""
+
+    time: int
+    icao24: np.ndarray
+    callsign: np.ndarray
+    country: np.ndarray
+    last_contact: np.ndarray
+    lon: np.ndarray
+    lat: np.ndarray
+    altitude: np.ndarray
+    on_ground: np.ndarray
+    velocity: np.ndarray
+    heading: np.ndarray
+    vertical_rate: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.icao24)
+
+    @classmethod
+    def from_response(cls, data: dict) -> "FlightColumns":
+        """
+        Build columns from an /api/states/all response
+
+        Rows without a position are dropped, like the filter in useFlightData.
+        """
+        states = data.get("states") or []
+        if states:
+            # Transpose once; only the first 12 fields are used
+            columns = list(zip(*(state[:12] for state in states)))
+        else:
+            columns = [()] * 12
+
+        def floats(values) -> np.ndarray:
+            # NumPy turns None into NaN for float dtype
+            return np.array(values, dtype=np.float64)
+
+        lon = floats(columns[5])
+        lat = floats(columns[6])
+        keep = ~(np.isnan(lat) | np.isnan(lon))
+
+        icao24 = np.array(columns[0], dtype=object)[keep]
+        callsign = np.array(
+            [(c or "").strip() or i for c, i in zip(columns[1], columns[0])], dtype=object
+        )[keep]
+
+        return cls(
+            time=int(data.get("time") or 0),
+            icao24=icao24,
+            callsign=callsign,
+            country=np.array(columns[2], dtype=object)[keep],
+            last_contact=floats(columns[4])[keep],
+            lon=lon[keep],
+            lat=lat[keep],
+            altitude=floats(columns[7])[keep],
+            on_ground=np.array(columns[8], dtype=bool)[keep],
+            velocity=floats(columns[9])[keep],
+            heading=floats(columns[10])[keep],
+            vertical_rate=floats(columns[11])[keep],
+        )
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid over flight positions
+
+    Rows are sorted by cell id once per snapshot; a query turns its bbox into
+    a run of cell ids per grid row and binary-searches each run, so the cost
+    scales with the flights near the query rather than the whole continent.
+    Queries do not wrap across the antimeridian.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float = 0.5):
+        self.lat = lat
+        self.lon = lon
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180 / cell_deg))
+        self.n_cols = int(np.ceil(360 / cell_deg))
+
+        cell_ids = self._row(lat) * self.n_cols + self._col(lon)
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.sorted_cells = cell_ids[self.order]
+
+    def _row(self, lat) -> np.ndarray:
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_deg), 0, self.n_rows - 1).astype(np.int64)
+
+    def _col(self, lon) -> np.ndarray:
+        return np.clip(np.floor((np.asarray(lon) + 180) / self.cell_deg), 0, self.n_cols - 1).astype(np.int64)
+
+    def _candidates(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> np.ndarray:
+        """Row indices of every flight in cells overlapping the bbox"""
+        rows = np.arange(self._row(min_lat), self._row(max_lat) + 1)
+        first = rows * self.n_cols + self._col(min_lon)
+        last = rows * self.n_cols + self._col(max_lon)
+        starts = np.searchsorted(self.sorted_cells, first, side="left")
+        ends = np.searchsorted(self.sorted_cells, last, side="right")
+        if not len(starts) or not (ends > starts).any():
+            return np.empty(0, dtype=np.int64)
+        return self.order[np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])]
+
+    def query_bbox(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> np.ndarray:
+        """Row indices of flights inside the bbox"""
+        candidates = self._candidates(min_lat, max_lat, min_lon, max_lon)
+        lat = self.lat[candidates]
+        lon = self.lon[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(candidates[inside])
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Row indices of flights within radius_km (great-circle) of a point"""
+        dlat = np.degrees(radius_km / EARTH_RADIUS_KM)
+        dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+        candidates = self.query_bbox(lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+        distances = haversine_km(self.lat[candidates], self.lon[candidates], lat, lon)
+        return candidates[distances <= radius_km]
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km; broadcasts over arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bearing_deg(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Initial bearing from point 1 to point 2, 0-360 degrees"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+
+def arrival_info(columns: FlightColumns, rows: np.ndarray, airport: Airport) -> Dict[str, np.ndarray]:
+    """
+    Distance, ETA and status for the given rows relative to an airport
+
+    A flight is arriving only if it is descending, pointed at the airport and
+    within ARRIVAL_RADIUS_KM; level flights passing over are "in-air". ETA is
+    distance over the speed component pointed at the airport, and is only set
+    for arriving flights. Missing heading/velocity/vertical rate (NaN) leaves
+    a flight "in-air" with no ETA.
+    """
+    lat = columns.lat[rows]
+    lon = columns.lon[rows]
+    on_ground = columns.on_ground[rows]
+    velocity = columns.velocity[rows]
+    vertical_rate = columns.vertical_rate[rows]
+
+    distance_km = haversine_km(lat, lon, airport.lat, airport.lon)
+    to_airport = bearing_deg(lat, lon, airport.lat, airport.lon)
+    off_course = np.abs((columns.heading[rows] - to_airport + 180) % 360 - 180)
+
+    airborne = ~on_ground & np.isfinite(velocity) & np.isfinite(vertical_rate)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        closing_speed = velocity * np.cos(np.radians(off_course))
+        arriving = (
+            airborne
+            & (off_course <= ARRIVAL_HEADING_DEG)
+            & (vertical_rate < 0)
+            & (distance_km <= ARRIVAL_RADIUS_KM)
+        )
+        departed = (
+            airborne
+            & (off_course >= 180 - ARRIVAL_HEADING_DEG)
+            & (vertical_rate > 0)
+            & (distance_km <= DEPARTURE_RADIUS_KM)
+        )
+        eta_seconds = np.where(arriving & (closing_speed > 0), distance_km * 1000 / closing_speed, np.nan)
+
+    status = np.select([on_ground, arriving, departed], [ON_GROUND, ARRIVING, DEPARTED], default=IN_AIR)
+    return {"distance_km": distance_km, "eta_seconds": eta_seconds, "status": status}
+
+
+def _nullable(values: np.ndarray, decimals: int) -> list:
+    """Round and convert to a JSON-ready list with NaN as None"""
+    rounded = np.round(values, decimals)
+    return [None if v != v else (int(v) if decimals == 0 else v) for v in rounded.tolist()]
+
+
+class Snapshot:
+    """One upstream response, loaded into columns and indexed"""
+
+    def __init__(self, columns: FlightColumns):
+        self.columns = columns
+        self.index = GridIndex(columns.lat, columns.lon)
+
+    @property
+    def version(self) -> int:
+        return self.columns.time
+
+    @classmethod
+    def from_body(cls, body: bytes) -> "Snapshot":
+        return cls(FlightColumns.from_response(json.loads(body)))
+
+    def board_flights(
+        self,
+        airport: Airport,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        radius_km: float = DEFAULT_RADIUS_KM,
+    ) -> Tuple[Dict[str, dict], List[str]]:
+        """
+        Flights for one board as ProcessedFlight-shaped dicts, plus display order
+
+        Order: arriving flights by ETA, then everything else by distance.
+        Values are rounded so unchanged flights compare equal across refreshes.
+        """
+        if bbox is not None:
+            rows = self.index.query_bbox(*bbox)
+        else:
+            rows = self.index.query_radius(airport.lat, airport.lon, radius_km)
+
+        info = arrival_info(self.columns, rows, airport)
+        sort_eta = np.where(np.isnan(info["eta_seconds"]), np.inf, info["eta_seconds"])
+        order = np.lexsort((info["distance_km"], sort_eta))
+        rows = rows[order]
+        info = {name: values[order] for name, values in info.items()}
+
+        c = self.columns
+        ids = c.icao24[rows].tolist()
+        fields = zip(
+            ids,
+            c.callsign[rows].tolist(),
+            c.country[rows].tolist(),
+            _nullable(c.last_contact[rows], 0),
+            _nullable(c.lat[rows], 4),
+            _nullable(c.lon[rows], 4),
+            _nullable(c.altitude[rows], 0),
+            c.on_ground[rows].tolist(),
+            _nullable(c.velocity[rows], 1),
+            _nullable(c.heading[rows], 0),
+            [STATUS_NAMES[code] for code in info["status"].tolist()],
+            _nullable(info["distance_km"], 1),
+            _nullable(info["eta_seconds"], 0),
+        )
+        flights = {
+            flight_id: {
+                "id": flight_id,
+                "callsign": callsign,
+                "country": country,
+                "lastContact": last_contact,
+                "position": {"lat": lat, "lng": lng},
+                "altitude": altitude,
+                "onGround": on_ground,
+                "velocity": velocity,
+                "heading": heading,
+                "status": status,
+                "distanceKm": distance_km,
+                "etaSeconds": eta_seconds,
+            }
+            for (flight_id, callsign, country, last_contact, lat, lng, altitude,
+                 on_ground, velocity, heading, status, distance_km, eta_seconds) in fields
+        }
+        return flights, ids
+
+
+class BoardFeed:
+    """
+    Pre-filtered flight list for one airport/area, delta-encoded per board
+
+    Keeps the last few versions; a board that sends `since` gets only the
+    flights that changed or disappeared since that version. Encoded responses
+    are memoized per `since`, so hundreds of boards on the same version cost
+    one encode.
+    """
+
+    def __init__(
+        self,
+        airport: Airport,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        radius_km: float = DEFAULT_RADIUS_KM,
+    ):
+        self.airport = airport
+        self.bbox = bbox
+        self.radius_km = radius_km
+        self.version: Optional[int] = None
+        self._history: Dict[int, Dict[str, dict]] = {}
+        self._order: List[str] = []
+        self._responses: Dict[Optional[int], bytes] = {}
+
+    def update(self, snapshot: Snapshot):
+        if snapshot.version == self.version:
+            return
+        flights, order = snapshot.board_flights(self.airport, self.bbox, self.radius_km)
+        self.version = snapshot.version
+        self._history[self.version] = flights
+        self._order = order
+        for old in sorted(self._history)[:-FEED_HISTORY]:
+            del self._history[old]
+        self._responses.clear()
+
+    def response(self, since: Optional[int] = None) -> bytes:
+        if since not in self._history:
+            since = None
+        if since not in self._responses:
+            self._responses[since] = json.dumps(self._encode(since), separators=(",", ":")).encode()
+        return self._responses[since]
+
+    def _encode(self, since: Optional[int]) -> dict:
+        current = self._history[self.version]
+        if since is None:
+            upserts = list(current.values())
+            removed = []
+        else:
+            previous = self._history[since]
+            upserts = [flight for flight_id, flight in current.items() if previous.get(flight_id) != flight]
+            removed = [flight_id for flight_id in previous if flight_id not in current]
+        return {
+            "airport": self.airport.code,
+            "version": self.version,
+            "full": since is None,
+            "upserts": upserts,
+            "removed": removed,
+            "order": self._order,
+        }
+
+
+class FlightProcessor:
+    """Builds snapshots from the proxy's cached upstream data and serves board feeds"""
+
+    def __init__(self, proxy, region):
+        # region is a FlightProxy cache key covering every board's airport; one
+        # fetch of it serves them all. Flights outside it never reach a board.
+        self.proxy = proxy
+        self.region = region
+        # key -> (feed, last requested at), least recently requested first
+        self.feeds: "OrderedDict[tuple, Tuple[BoardFeed, float]]" = OrderedDict()
+        self._snapshot: Optional[Snapshot] = None
+        self._snapshot_entry = None
+        self._lock = asyncio.Lock()
+
+    async def snapshot(self) -> Snapshot:
+        """Current snapshot, rebuilt only when the proxy has a new upstream entry"""
+        entry, _ = await self.proxy.get_states(self.region)
+        if entry is not self._snapshot_entry:
+            async with self._lock:
+                if entry is not self._snapshot_entry:
+                    # Parsing a continent-sized response is CPU work; keep it off the loop
+                    self._snapshot = await asyncio.to_thread(Snapshot.from_body, entry.body)
+                    self._snapshot_entry = entry
+        return self._snapshot
+
+    def feed(self, airport: Airport, bbox, radius_km: float) -> BoardFeed:
+        now = time.monotonic()
+        key = (airport.code, bbox, radius_km if bbox is None else None)
+        if key in self.feeds:
+            feed, _ = self.feeds.pop(key)
+        else:
+            feed = BoardFeed(airport, bbox, radius_km)
+        self.feeds[key] = (feed, now)
+        self._evict(now)
+        return feed
+
+    def _evict(self, now: float):
+        """Drop idle feeds, then the least recently requested ones over MAX_FEEDS"""
+        while self.feeds:
+            _, (_, last_requested) = next(iter(self.feeds.items()))
+            if len(self.feeds) <= MAX_FEEDS and now - last_requested <= FEED_IDLE_SECONDS:
+                break
+            self.feeds.popitem(last=False)
+
+    async def handle_board(self, request: web.Request) -> web.Response:
+        airport = AIRPORTS.get(request.match_info["airport"].upper())
+        if airport is None:
+            return web.json_response({"error": f"Unknown airport: {request.match_info['airport']}"}, status=404)
+
+        query = request.query
+        try:
+            bbox = None
+            if all(name in query for name in ("lamin", "lamax", "lomin", "lomax")):
+                bbox = tuple(float(query[name]) for name in ("lamin", "lamax", "lomin", "lomax"))
+            radius_km = float(query.get("radius_km", DEFAULT_RADIUS_KM))
+            since = int(query["since"]) if query.get("since") else None
+        except ValueError:
+            return web.json_response({"error": "bbox, radius_km and since must be numbers"}, status=400)
+
+        # Checked before a BoardFeed exists, so junk never takes a MAX_FEEDS slot
+        if not all(math.isfinite(value) for value in (*(bbox or ()), radius_km)):
+            return web.json_response({"error": "bbox and radius_km must be finite"}, status=400)
+        if bbox is not None and (bbox[0] > bbox[1] or bbox[2] > bbox[3]):
+            return web.json_response({"error": "bbox needs lamin <= lamax and lomin <= lomax"}, status=400)
+        if radius_km <= 0:
+            return web.json_response({"error": "radius_km must be positive"}, status=400)
+
+        # Upstream failures are turned into responses by flight_proxy's middleware
+        snapshot = await self.snapshot()
+        feed = self.feed(airport, bbox, radius_km)
+        feed.update(snapshot)
+        return web.Response(body=feed.response(since), content_type="application/json")
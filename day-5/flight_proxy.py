@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Caching, coalescing proxy for OpenSky flight data
+
+Every Homecoming Board calls /api/states/all on its own, so each kiosk burns
+its own OpenSky rate limit. Point the boards at this proxy instead
+(VITE_FLIGHT_PROXY_URL) and one process serves all of them:
+
+- Coalescing: concurrent requests for the same bounding box share a single
+  upstream call
+- TTL cache with stale-while-revalidate: fresh entries are served straight
+  from memory; stale ones are served immediately while one background
+  refresh runs
+- Stale-if-error: if OpenSky fails or rate-limits us, the last good response
+  is served instead of an error
+- Backoff: after a failed fetch, nothing goes upstream for that bbox until
+  Retry-After (or a short cooldown) has passed
+- Pooled upstream connections: one aiohttp session with keep-alive
+- Board feeds: /api/boards/{airport}/flights serves each board a
+  pre-filtered, delta-encoded flight list (see flight_processing.py)
+
+Usage:
+    python flight_proxy.py --region 24,50,-125,-66
+    OPENSKY_USERNAME=... OPENSKY_PASSWORD=... python flight_proxy.py --region 24,50,-125,-66
+
+--region (lamin,lamax,lomin,lomax) is the area fetched for board feeds. It
+must cover every board's airport and radius; keep it as small as that allows,
+since a global states/all costs far more OpenSky credits and parse time.
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from flight_processing import FlightProcessor
+
+OPENSKY_URL = "https://opensky-network.org/api/states/all"
+
+# Query parameters that select data; anything else is dropped from the cache key
+BBOX_PARAMS = ("lamin", "lamax", "lomin", "lomax")
+
+logger = logging.getLogger("flight_proxy")
+
+CacheKey = Tuple[Tuple[str, str], ...]
+
+
+class UpstreamError(Exception):
+    """OpenSky answered with a non-200 status"""
+
+    def __init__(self, status: int, retry_after: Optional[str] = None):
+        super().__init__(f"OpenSky API error: {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    fetched_at: float
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+
+class FlightProxy:
+    """Coalescing TTL cache in front of the OpenSky states endpoint"""
+
+    def __init__(
+        self,
+        upstream_url: str = OPENSKY_URL,
+        fresh_ttl: float = 20.0,
+        max_stale: float = 120.0,
+        pool_size: int = 10,
+        timeout: float = 15.0,
+        error_cooldown: float = 10.0,
+        auth: Optional[aiohttp.BasicAuth] = None,
+    ):
+        self.upstream_url = upstream_url
+        self.fresh_ttl = fresh_ttl
+        self.max_stale = max_stale
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.error_cooldown = error_cooldown
+        self.auth = auth
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cache: Dict[CacheKey, CacheEntry] = {}
+        self._inflight: Dict[CacheKey, asyncio.Task] = {}
+        # After a failed fetch: when upstream may be tried again, and the error to repeat until then
+        self._retry_not_before: Dict[CacheKey, float] = {}
+        self._last_error: Dict[CacheKey, Exception] = {}
+
+        self.stats = {"hit": 0, "stale": 0, "miss": 0, "upstream_requests": 0, "upstream_errors": 0}
+
+    async def start(self, app: Optional[web.Application] = None):
+        # A single session keeps upstream connections alive between refreshes
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, auth=self.auth)
+
+    async def close(self, app: Optional[web.Application] = None):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def cache_key(query) -> CacheKey:
+        """
+        Normalize bbox parameters so "40.5" and "40.50" share one entry
+
+        Raises ValueError for non-numeric or non-finite coordinates, so junk
+        like lamin=nan never reaches the cache or OpenSky.
+        """
+        key = []
+        for name in BBOX_PARAMS:
+            if name in query:
+                value = float(query[name])
+                if not math.isfinite(value):
+                    raise ValueError(f"{name} must be finite")
+                key.append((name, f"{value:.4f}"))
+        return tuple(key)
+
+    async def get_states(self, key: CacheKey) -> Tuple[CacheEntry, str]:
+        """Return (entry, cache status) for a bbox, fetching upstream if needed"""
+        now = time.monotonic()
+        entry = self._cache.get(key)
+
+        if entry is not None and entry.age(now) < self.fresh_ttl:
+            self.stats["hit"] += 1
+            return entry, "HIT"
+
+        cooling_down = now < self._retry_not_before.get(key, 0.0)
+
+        if entry is not None and (cooling_down or entry.age(now) < self.fresh_ttl + self.max_stale):
+            if not cooling_down:
+                self._refresh(key)
+            self.stats["stale"] += 1
+            return entry, "STALE"
+
+        if cooling_down:
+            raise self._cooldown_error(key, now)
+
+        try:
+            # shield: a board disconnecting must not cancel the shared fetch
+            entry = await asyncio.shield(self._refresh(key))
+        except (UpstreamError, aiohttp.ClientError, asyncio.TimeoutError):
+            fallback = self._cache.get(key)
+            if fallback is None:
+                raise
+            self.stats["stale"] += 1
+            return fallback, "STALE"
+
+        self.stats["miss"] += 1
+        return entry, "MISS"
+
+    def _refresh(self, key: CacheKey) -> asyncio.Task:
+        """Start an upstream fetch for key, or join the one already running"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return task
+
+    def _cooldown_error(self, key: CacheKey, now: float) -> Exception:
+        """The last upstream error for key, with Retry-After set to the time left"""
+        error = self._last_error[key]
+        if isinstance(error, UpstreamError):
+            remaining = math.ceil(self._retry_not_before[key] - now)
+            return UpstreamError(error.status, str(max(1, remaining)))
+        return error
+
+    def _record_failure(self, key: CacheKey, error: Exception):
+        """Hold off on upstream for this key until Retry-After or the default cooldown"""
+        cooldown = self.error_cooldown
+        retry_after = getattr(error, "retry_after", None)
+        # Retry-After may also be an HTTP date; only the seconds form is honored
+        if retry_after and retry_after.strip().isdigit():
+            cooldown = float(retry_after)
+        self._retry_not_before[key] = time.monotonic() + cooldown
+        self._last_error[key] = error
+
+    def _fetch_done(self, key: CacheKey, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Background refreshes have no awaiting caller, so failures are logged here
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["upstream_errors"] += 1
+            logger.warning("Upstream fetch failed for %s: %s", dict(key), task.exception())
+
+    async def _fetch(self, key: CacheKey) -> CacheEntry:
+        self.stats["upstream_requests"] += 1
+        try:
+            async with self._session.get(self.upstream_url, params=dict(key)) as response:
+                if response.status != 200:
+                    raise UpstreamError(response.status, response.headers.get("Retry-After"))
+                body = await response.read()
+        except (UpstreamError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._record_failure(key, e)
+            raise
+
+        self._retry_not_before.pop(key, None)
+        self._last_error.pop(key, None)
+        entry = CacheEntry(body=body, fetched_at=time.monotonic())
+        self._cache[key] = entry
+        self._prune(entry.fetched_at)
+        return entry
+
+    def _prune(self, now: float):
+        """Drop entries too old to serve even as stale"""
+        expired = [k for k, e in self._cache.items() if e.age(now) >= self.fresh_ttl + self.max_stale]
+        for k in expired:
+            del self._cache[k]
+
+    async def handle_states(self, request: web.Request) -> web.Response:
+        try:
+            key = self.cache_key(request.query)
+        except ValueError:
+            return web.json_response({"error": "Bounding box parameters must be finite numbers"}, status=400)
+
+        entry, cache_status = await self.get_states(key)
+        age = entry.age(time.monotonic())
+        return web.Response(
+            body=entry.body,
+            content_type="application/json",
+            headers={
+                "X-Cache": cache_status,
+                "Age": str(int(age)),
+                "Cache-Control": f"public, max-age={max(0, int(self.fresh_ttl - age))}",
+            },
+        )
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            **self.stats,
+            "cached_bboxes": len(self._cache),
+            "inflight": len(self._inflight),
+        })
+
+
+@web.middleware
+async def cors_middleware(request: web.Request, handler):
+    # Boards fetch from the browser, so every response needs CORS headers
+    if request.method == "OPTIONS":
+        response = web.Response()
+    else:
+        response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+    return response
+
+
+@web.middleware
+async def upstream_error_middleware(request: web.Request, handler):
+    try:
+        return await handler(request)
+    except UpstreamError as e:
+        # Pass rate limiting through so boards back off; everything else is a bad gateway
+        status = 429 if e.status == 429 else 502
+        headers = {"Retry-After": e.retry_after} if e.retry_after else None
+        return web.json_response({"error": str(e)}, status=status, headers=headers)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return web.json_response({"error": f"OpenSky unreachable: {e}"}, status=502)
+
+
+def create_app(proxy: FlightProxy, processor: Optional[FlightProcessor] = None) -> web.Application:
+    app = web.Application(middlewares=[cors_middleware, upstream_error_middleware])
+    app.router.add_get("/api/states/all", proxy.handle_states)
+    if processor is not None:
+        app.router.add_get("/api/boards/{airport}/flights", processor.handle_board)
+    app.router.add_get("/health", proxy.handle_health)
+    app.on_startup.append(proxy.start)
+    app.on_cleanup.append(proxy.close)
+    return app
+
+
+def parse_region(value: str) -> CacheKey:
+    """argparse type for --region: lamin,lamax,lomin,lomax as a cache key"""
+    parts = value.split(",")
+    try:
+        if len(parts) != len(BBOX_PARAMS):
+            raise ValueError
+        return FlightProxy.cache_key(dict(zip(BBOX_PARAMS, parts)))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected lamin,lamax,lomin,lomax, got {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching, coalescing proxy for OpenSky flight data")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--upstream", default=OPENSKY_URL)
+    parser.add_argument("--fresh-ttl", type=float, default=20.0,
+                        help="seconds a response is served without revalidating (default: 20)")
+    parser.add_argument("--max-stale", type=float, default=120.0,
+                        help="extra seconds a stale response may be served while refreshing (default: 120)")
+    parser.add_argument("--pool-size", type=int, default=10, help="max upstream connections (default: 10)")
+    parser.add_argument("--error-cooldown", type=float, default=10.0,
+                        help="seconds to wait after a failed fetch without Retry-After (default: 10)")
+    parser.add_argument("--region", type=parse_region, required=True,
+                        help="lamin,lamax,lomin,lomax fetched for board feeds; must cover every board")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    auth = None
+    if os.environ.get("OPENSKY_USERNAME"):
+        auth = aiohttp.BasicAuth(os.environ["OPENSKY_USERNAME"], os.environ.get("OPENSKY_PASSWORD", ""))
+
+    proxy = FlightProxy(
+        upstream_url=args.upstream,
+        fresh_ttl=args.fresh_ttl,
+        max_stale=args.max_stale,
+        pool_size=args.pool_size,
+        error_cooldown=args.error_cooldown,
+        auth=auth,
+    )
+    processor = FlightProcessor(proxy, region=args.region)
+
+    print(f"🛫 Flight proxy on http://{args.host}:{args.port} -> {args.upstream}")
+    web.run_app(create_app(proxy, processor), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
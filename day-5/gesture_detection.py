@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Vectorized port of homecoming-board/src/utils/gestureDetection.ts
+
+The board classifies one frame at a time in the browser. This module runs the
+exact same math over whole recordings at once, using NumPy arrays shaped
+(frames, 21, 3) in MediaPipe's normalized landmark layout.
+
+Curl ratios and classifications match the TypeScript implementation, so any
+thresholds tuned here behave the same once loaded into the board.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+# Hand landmark indices (MediaPipe standard), same as LANDMARK_INDICES in TS
+WRIST = 0
+THUMB_MCP = 2
+THUMB_TIP = 4
+INDEX_MCP = 5
+INDEX_TIP = 8
+MIDDLE_MCP = 9
+MIDDLE_TIP = 12
+RING_MCP = 13
+RING_TIP = 16
+PINKY_MCP = 17
+PINKY_TIP = 20
+
+# Curl columns are ordered [index, middle, ring, pinky, thumb], matching the
+# "Finger curls [Index, Middle, Ring, Pinky, Thumb]" debug log on the board
+CURL_TIPS = np.array([INDEX_TIP, MIDDLE_TIP, RING_TIP, PINKY_TIP, THUMB_TIP])
+CURL_MCPS = np.array([INDEX_MCP, MIDDLE_MCP, RING_MCP, PINKY_MCP, THUMB_MCP])
+
+# Gesture codes; GESTURE_NAMES[code] is the GestureType string used in TS
+UNKNOWN = 0
+CLOSED_FIST = 1
+OPEN_PALM = 2
+THUMBS_UP = 3
+THUMBS_DOWN = 4
+
+GESTURE_NAMES = ["UNKNOWN", "CLOSED_FIST", "OPEN_PALM", "THUMBS_UP", "THUMBS_DOWN"]
+GESTURE_CODES = {name: code for code, name in enumerate(GESTURE_NAMES)}
+
+# Field order used whenever thresholds are packed into an array
+THRESHOLD_FIELDS = [
+    "fistCurlThreshold",
+    "fistMinFingers",
+    "palmExtendThreshold",
+    "palmThumbMultiplier",
+    "thumbsUpFingerCurl",
+    "thumbsUpThumbExtend",
+    "thumbsUpMinFingers",
+    "thumbsUpYThreshold",
+    "thumbsUpXThreshold",
+]
+
+DEFAULT_THRESHOLDS: Dict[str, float] = {
+    "fistCurlThreshold": 0.4,
+    "fistMinFingers": 3,
+    "palmExtendThreshold": 0.3,
+    "palmThumbMultiplier": 1.5,
+    "thumbsUpFingerCurl": 0.6,
+    "thumbsUpThumbExtend": 0.25,
+    "thumbsUpMinFingers": 3,
+    "thumbsUpYThreshold": 0.05,
+    "thumbsUpXThreshold": 0.15,
+}
+
+
+def as_landmark_array(landmarks) -> np.ndarray:
+    """Coerce landmarks to a float64 (frames, 21, 3) array"""
+    array = np.asarray(landmarks, dtype=np.float64)
+    if array.ndim == 2:
+        array = array[np.newaxis]
+    if array.ndim != 3 or array.shape[1] < 21 or array.shape[2] < 2:
+        raise ValueError(f"Expected landmarks shaped (frames, 21, 3), got {array.shape}")
+    return array
+
+
+def finger_curl_ratios(landmarks) -> np.ndarray:
+    """
+    Curl ratio of every finger for every frame, shaped (frames, 5)
+
+    Same mapping as getFingerCurlRatio: tip-to-wrist over MCP-to-wrist in the
+    image plane, mapped so 0 = extended and 1 = curled.
+    """
+    points = as_landmark_array(landmarks)[:, :, :2]
+    wrist = points[:, WRIST:WRIST + 1, :]
+
+    tip_to_wrist = np.linalg.norm(points[:, CURL_TIPS, :] - wrist, axis=-1)
+    mcp_to_wrist = np.linalg.norm(points[:, CURL_MCPS, :] - wrist, axis=-1)
+
+    # Degenerate frames (MCP on top of the wrist) give inf/NaN just like the
+    # JS division does; NaN then fails every comparison, as it does in TS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = tip_to_wrist / mcp_to_wrist
+        return np.clip((1.3 - ratio) / 0.4, 0.0, 1.0)
+
+
+def extract_features(landmarks) -> Dict[str, np.ndarray]:
+    """
+    Everything detectGesture reads from a frame, precomputed once per recording
+
+    Threshold searches reuse these columns for every candidate instead of
+    recomputing distances from the raw landmarks.
+    """
+    points = as_landmark_array(landmarks)
+    return {
+        "curls": finger_curl_ratios(points),
+        "thumb_tip_x": points[:, THUMB_TIP, 0],
+        "thumb_tip_y": points[:, THUMB_TIP, 1],
+        "thumb_mcp_x": points[:, THUMB_MCP, 0],
+        "thumb_mcp_y": points[:, THUMB_MCP, 1],
+        "wrist_y": points[:, WRIST, 1],
+        "index_mcp_y": points[:, INDEX_MCP, 1],
+    }
+
+
+def thresholds_to_array(thresholds: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Pack a thresholds dict into a (9,) array ordered by THRESHOLD_FIELDS"""
+    merged = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    return np.array([merged[field] for field in THRESHOLD_FIELDS], dtype=np.float64)
+
+
+def array_to_thresholds(values: Iterable[float]) -> Dict[str, float]:
+    """Unpack a (9,) array back into a GestureThresholds-shaped dict"""
+    thresholds = {}
+    for field, value in zip(THRESHOLD_FIELDS, values):
+        if field.endswith("MinFingers"):
+            thresholds[field] = int(round(float(value)))
+        else:
+            thresholds[field] = round(float(value), 4)
+    return thresholds
+
+
+def classify_features(features: Dict[str, np.ndarray], candidates: np.ndarray) -> np.ndarray:
+    """
+    Classify every frame under every candidate threshold set
+
+    `candidates` is (K, 9) in THRESHOLD_FIELDS order; the result is a (K, frames)
+    array of gesture codes. Checks run in the same priority as detectGesture:
+    thumbs up, thumbs down, closed fist, open palm.
+    """
+    candidates = np.atleast_2d(np.asarray(candidates, dtype=np.float64))
+    # (K, 1) columns broadcast against (frames,) feature rows
+    (fist_curl, fist_min, palm_extend, palm_thumb_mult,
+     up_finger_curl, up_thumb_extend, up_min, up_y, up_x) = (
+        candidates[:, i:i + 1] for i in range(len(THRESHOLD_FIELDS))
+    )
+
+    curls = features["curls"]
+    finger_curls = curls[:, :4]
+    thumb_curl = curls[:, 4]
+    thumb_tip_x = features["thumb_tip_x"]
+    thumb_tip_y = features["thumb_tip_y"]
+    thumb_mcp_y = features["thumb_mcp_y"]
+    wrist_y = features["wrist_y"]
+
+    # Finger counts per candidate: (K, frames, 4) compared then summed
+    curled_for_thumbs = finger_curls[np.newaxis] > up_finger_curl[:, :, np.newaxis]
+    curled_for_fist = finger_curls[np.newaxis] > fist_curl[:, :, np.newaxis]
+    extended_for_palm = finger_curls[np.newaxis] < palm_extend[:, :, np.newaxis]
+
+    is_thumbs_up = (
+        (curled_for_thumbs.sum(axis=-1) >= up_min)
+        & (thumb_curl < up_thumb_extend)
+        & (thumb_tip_y < thumb_mcp_y - 0.03)
+        & (thumb_tip_y < wrist_y - up_y)
+        & (thumb_tip_y < features["index_mcp_y"])
+        & (np.abs(thumb_tip_x - features["thumb_mcp_x"]) < up_x)
+    )
+
+    # detectThumbsDown is called with thumbsUpFingerCurl and a fixed 0.3 thumb
+    is_thumbs_down = (
+        curled_for_thumbs.all(axis=-1)
+        & (thumb_curl < 0.3)
+        & (thumb_tip_y > thumb_mcp_y)
+        & (thumb_tip_y > wrist_y)
+    )
+
+    is_fist = curled_for_fist.sum(axis=-1) >= fist_min
+
+    is_palm = extended_for_palm.all(axis=-1) & (thumb_curl < palm_extend * palm_thumb_mult)
+
+    # np.select picks the first matching condition, preserving TS priority
+    return np.select(
+        [is_thumbs_up, is_thumbs_down, is_fist, is_palm],
+        [THUMBS_UP, THUMBS_DOWN, CLOSED_FIST, OPEN_PALM],
+        default=UNKNOWN,
+    ).astype(np.int8)
+
+
+def classify_gestures(landmarks, thresholds: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Classify a (frames, 21, 3) recording with one threshold set, like detectGesture"""
+    features = extract_features(landmarks)
+    return classify_features(features, thresholds_to_array(thresholds))[0]
+
+
+def debounce_gestures(
+    gestures: np.ndarray,
+    timestamps_ms: np.ndarray,
+    debounce_ms: float = 300,
+) -> List[int]:
+    """
+    Port of GestureDebouncer.process over a whole recording
+
+    Returns the frame indices where the board would fire a gesture. This one
+    stays a loop: each decision depends on the previously emitted gesture.
+    """
+    events = []
+    last_gesture = UNKNOWN
+    last_time = 0.0
+
+    for frame, (gesture, now) in enumerate(zip(gestures, timestamps_ms)):
+        if gesture == last_gesture and now - last_time < debounce_ms:
+            continue
+        if gesture == UNKNOWN:
+            continue
+        last_gesture = gesture
+        last_time = now
+        events.append(frame)
+
+    return events
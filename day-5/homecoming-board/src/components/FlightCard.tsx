@@ -92,7 +92,7 @@ export function FlightCard({ flight, isSelected = false, onClick }: FlightCardPr
         <div className="text-right">
           <p className="text-gray-400">Last Contact</p>
           <p className="font-semibold text-white">
-            {flight.lastContact.toLocaleTimeString()}
+            {flight.lastContact !== null ? flight.lastContact.toLocaleTimeString() : 'N/A'}
           </p>
         </div>
       </div>
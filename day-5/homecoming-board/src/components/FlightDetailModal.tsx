@@ -65,7 +65,12 @@ export function FlightDetailModal({ flight, open, onOpenChange }: FlightDetailMo
                 {flight.status}
               </div>
               <span className="text-sm text-gray-300">
-                Last contact: <time dateTime={flight.lastContact.toISOString()}>{flight.lastContact.toLocaleString()}</time>
+                Last contact:{' '}
+                {flight.lastContact !== null ? (
+                  <time dateTime={flight.lastContact.toISOString()}>{flight.lastContact.toLocaleString()}</time>
+                ) : (
+                  'N/A'
+                )}
               </span>
             </div>
           </section>
@@ -1,3 +1,4 @@
+import { useRef } from 'react';
 import { useQuery } from '@tanstack/react-query';
 
 // Flight data types based on OpenSky Network API
@@ -48,7 +49,7 @@ export interface ProcessedFlight {
   id: string;
   callsign: string;
   country: string;
-  lastContact: Date;
+  lastContact: Date | null; // null if the board feed had no last contact
   position: {
     lat: number;
     lng: number;
@@ -58,6 +59,32 @@ export interface ProcessedFlight {
   velocity: number | null;
   heading: number | null;
   status: 'arriving' | 'departed' | 'in-air' | 'on-ground';
+  // Only set when the board feed from flight_proxy.py is used
+  distanceKm?: number | null;
+  etaSeconds?: number | null;
+}
+
+// Board feed served by flight_proxy.py at /api/boards/{airport}/flights.
+// The server filters, computes status/ETA and sends only what changed since
+// the version this board already has.
+interface BoardFeedFlight extends Omit<ProcessedFlight, 'lastContact'> {
+  lastContact: number | null; // Unix seconds
+}
+
+interface BoardFeedResponse {
+  airport: string;
+  version: number;
+  full: boolean;
+  upserts: BoardFeedFlight[];
+  removed: string[];
+  order: string[]; // Flight ids in display order
+}
+
+interface BoardFeedState {
+  key: string;
+  version: number;
+  flights: Map<string, ProcessedFlight>;
+  order: string[];
 }
 
 // Bounding box for specific airport area (example: JFK Airport area)
@@ -69,6 +96,62 @@ const DEFAULT_BBOX = {
   maxLng: -73.6,
 };
 
+// Base URL for flight data. Set VITE_FLIGHT_PROXY_URL to a shared
+// flight_proxy.py instance so all boards share one cached upstream request.
+// It may include a path prefix (e.g. https://host/flights); the trailing
+// slash keeps that prefix when API paths are resolved against it.
+// The proxy's board feed only sees flights inside its --region
+// (lamin,lamax,lomin,lomax), so that region must cover this board's bbox.
+const FLIGHT_API_BASE: string =
+  (import.meta.env.VITE_FLIGHT_PROXY_URL || 'https://opensky-network.org').replace(/\/?$/, '/');
+
+// With a proxy configured, boards use its pre-processed feed instead of raw states
+const USE_BOARD_FEED = Boolean(import.meta.env.VITE_FLIGHT_PROXY_URL);
+
+/**
+ * Fetch the board feed and apply it on top of the flights we already have
+ */
+async function fetchBoardFeed(
+  airport: string,
+  bbox: typeof DEFAULT_BBOX,
+  previous: BoardFeedState | null
+): Promise<BoardFeedState> {
+  const key = JSON.stringify([airport, bbox]);
+  const url = new URL(`api/boards/${encodeURIComponent(airport)}/flights`, FLIGHT_API_BASE);
+  url.searchParams.append('lamin', bbox.minLat.toString());
+  url.searchParams.append('lamax', bbox.maxLat.toString());
+  url.searchParams.append('lomin', bbox.minLng.toString());
+  url.searchParams.append('lomax', bbox.maxLng.toString());
+  const current = previous && previous.key === key ? previous : null;
+  if (current) {
+    url.searchParams.append('since', current.version.toString());
+  }
+
+  const response = await fetch(url.toString());
+
+  if (!response.ok) {
+    throw new Error(`Flight proxy error: ${response.status} ${response.statusText}`);
+  }
+
+  const data: BoardFeedResponse = await response.json();
+
+  const flights = current && !data.full
+    ? new Map(current.flights)
+    : new Map<string, ProcessedFlight>();
+  for (const id of data.removed) {
+    flights.delete(id);
+  }
+  for (const flight of data.upserts) {
+    flights.set(flight.id, {
+      ...flight,
+      lastContact: flight.lastContact !== null ? new Date(flight.lastContact * 1000) : null,
+    });
+  }
+
+  console.log(`✅ Board feed v${data.version}: ${data.upserts.length} updated, ${data.removed.length} removed`);
+  return { key, version: data.version, flights, order: data.order };
+}
+
 interface UseFlightDataOptions {
   airport?: string;
   bbox?: typeof DEFAULT_BBOX;
@@ -94,14 +177,23 @@ export function useFlightData(options: UseFlightDataOptions = {}) {
     enabled = true,
   } = options;
 
+  // Last applied board feed, so refetches only download the delta
+  const boardFeedRef = useRef<BoardFeedState | null>(null);
+
   return useQuery<ProcessedFlight[], Error>({
     queryKey: ['flights', airport, bbox],
     
     queryFn: async (): Promise<ProcessedFlight[]> => {
       console.log('🛫 Fetching flight data...');
+
+      if (USE_BOARD_FEED) {
+        const feed = await fetchBoardFeed(airport, bbox, boardFeedRef.current);
+        boardFeedRef.current = feed;
+        return feed.order.flatMap((id) => feed.flights.get(id) ?? []);
+      }
       
       // OpenSky Network API endpoint with bounding box
-      const url = new URL('https://opensky-network.org/api/states/all');
+      const url = new URL('api/states/all', FLIGHT_API_BASE);
       url.searchParams.append('lamin', bbox.minLat.toString());
       url.searchParams.append('lamax', bbox.maxLat.toString());
       url.searchParams.append('lomin', bbox.minLng.toString());
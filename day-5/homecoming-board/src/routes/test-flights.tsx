@@ -135,7 +135,7 @@ function TestFlights() {
                   )}
 
                   <div className="mt-2 text-xs text-gray-500">
-                    Last contact: {flight.lastContact.toLocaleString()}
+                    Last contact: {flight.lastContact !== null ? flight.lastContact.toLocaleString() : 'N/A'}
                   </div>
                 </div>
               ))}
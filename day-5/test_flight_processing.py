@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Tests for flight_processing.py
+
+Index queries are checked against brute force on a synthetic continent-scale
+snapshot; board feeds are exercised end to end through the proxy and the
+stand-in OpenSky from test_flight_proxy.py.
+
+Run directly (python test_flight_processing.py) or with pytest.
+"""
+
+import asyncio
+import json
+import time
+
+import numpy as np
+from aiohttp.test_utils import make_mocked_request
+
+from flight_processing import (
+    AIRPORTS,
+    FEED_IDLE_SECONDS,
+    MAX_FEEDS,
+    BoardFeed,
+    FlightColumns,
+    FlightProcessor,
+    Snapshot,
+    arrival_info,
+    haversine_km,
+)
+from test_flight_proxy import REGION, start_stack, stop_stack
+
+JFK = AIRPORTS["JFK"]
+JFK_BBOX = (40.5, 40.8, -74.0, -73.6)
+
+
+def state(icao24, lat, lon, on_ground=False, velocity=120.0, heading=90.0, vertical_rate=-5.0,
+          callsign=None, altitude=1000.0):
+    """One OpenSky state vector row"""
+    return [icao24, callsign, "United States", 0, 1700000000, lon, lat, altitude,
+            on_ground, velocity, heading, vertical_rate, None, altitude, None, False, 0]
+
+
+def continent_states(count: int, seed: int = 0) -> list:
+    """Random flights over North America"""
+    rng = np.random.default_rng(seed)
+    return [
+        state(f"{i:06x}", lat, lon, heading=heading, velocity=velocity)
+        for i, (lat, lon, heading, velocity) in enumerate(zip(
+            rng.uniform(25, 50, count), rng.uniform(-125, -65, count),
+            rng.uniform(0, 360, count), rng.uniform(50, 250, count),
+        ))
+    ]
+
+
+def test_columns_drop_rows_without_position():
+    columns = FlightColumns.from_response({"time": 5, "states": [
+        state("abc123", 40.6, -73.8, callsign="DAL42  "),
+        state("def456", None, None),
+        state("fed654", 40.7, -73.9, velocity=None),
+    ]})
+    assert columns.time == 5
+    assert columns.icao24.tolist() == ["abc123", "fed654"]
+    assert columns.callsign.tolist() == ["DAL42", "fed654"]
+    assert np.isnan(columns.velocity[1])
+
+    empty = FlightColumns.from_response({"time": 6, "states": None})
+    assert len(empty) == 0
+    assert len(Snapshot(empty).board_flights(JFK)[0]) == 0
+
+
+def test_grid_queries_match_brute_force():
+    snapshot = Snapshot(FlightColumns.from_response({"time": 1, "states": continent_states(50000)}))
+    lat, lon = snapshot.columns.lat, snapshot.columns.lon
+
+    for bbox in [JFK_BBOX, (30.0, 45.5, -100.2, -80.7), (10.0, 20.0, 0.0, 10.0)]:
+        expected = np.flatnonzero((lat >= bbox[0]) & (lat <= bbox[1]) & (lon >= bbox[2]) & (lon <= bbox[3]))
+        assert np.array_equal(snapshot.index.query_bbox(*bbox), expected)
+
+    for airport in AIRPORTS.values():
+        expected = np.flatnonzero(haversine_km(lat, lon, airport.lat, airport.lon) <= 150)
+        assert np.array_equal(np.sort(snapshot.index.query_radius(airport.lat, airport.lon, 150)), expected)
+
+
+def test_arrival_status_and_eta():
+    columns = FlightColumns.from_response({"time": 1, "states": [
+        # 50 km west of JFK, flying east at 100 m/s, descending
+        state("arrive", JFK.lat, JFK.lon - 0.593, heading=90.0, velocity=100.0),
+        # Just east of JFK, flying east and climbing
+        state("depart", JFK.lat, JFK.lon + 0.1, heading=90.0, vertical_rate=8.0),
+        state("ground", JFK.lat, JFK.lon, on_ground=True, velocity=5.0),
+        state("nohead", JFK.lat + 0.2, JFK.lon, heading=None),
+        # Null vertical rate or velocity is not evidence of a descent
+        state("novert", JFK.lat, JFK.lon - 0.593, heading=90.0, vertical_rate=None),
+        state("nospeed", JFK.lat, JFK.lon - 0.593, heading=90.0, velocity=None),
+        # Pointed at JFK from Denver: level cruise, and descending but too far out
+        state("cruise", 39.86, -104.67, heading=80.0, vertical_rate=0.0),
+        state("farout", 39.86, -104.67, heading=80.0),
+    ]})
+    info = arrival_info(columns, np.arange(len(columns)), JFK)
+
+    assert [int(s) for s in info["status"]] == [2, 3, 1, 0, 0, 0, 0, 0]
+    assert abs(info["distance_km"][0] - 50) < 1
+    assert abs(info["eta_seconds"][0] - 500) < 10
+    assert np.isnan(info["eta_seconds"][1:]).all()
+
+
+def test_board_feed_deltas():
+    def snapshot_at(version, states):
+        return Snapshot(FlightColumns.from_response({"time": version, "states": states}))
+
+    parked = state("parked", 40.64, -73.78, on_ground=True, velocity=0.0, heading=0.0)
+    feed = BoardFeed(JFK, bbox=JFK_BBOX)
+
+    feed.update(snapshot_at(100, [parked, state("moving", 40.6, -73.9)]))
+    full = json.loads(feed.response())
+    assert full["full"] and full["version"] == 100
+    assert {f["id"] for f in full["upserts"]} == {"parked", "moving"}
+
+    feed.update(snapshot_at(110, [parked, state("moving", 40.6, -73.85), state("newone", 40.7, -73.7)]))
+    delta = json.loads(feed.response(since=100))
+    assert not delta["full"] and delta["version"] == 110
+    assert {f["id"] for f in delta["upserts"]} == {"moving", "newone"}
+    assert delta["removed"] == []
+    assert sorted(delta["order"]) == ["moving", "newone", "parked"]
+
+    feed.update(snapshot_at(120, [parked]))
+    delta = json.loads(feed.response(since=110))
+    assert delta["upserts"] == []
+    assert sorted(delta["removed"]) == ["moving", "newone"]
+
+    # Same encoded bytes for every board on the same version
+    assert feed.response(since=110) is feed.response(since=110)
+    # Unknown versions fall back to a full list
+    assert json.loads(feed.response(since=1))["full"]
+
+
+def test_idle_board_feeds_are_evicted():
+    processor = FlightProcessor(proxy=None, region=())
+    jfk = processor.feed(JFK, None, 20.0)
+    assert processor.feed(JFK, None, 20.0) is jfk
+
+    # Every distinct radius is a new feed; the least recently requested go first
+    for radius in range(MAX_FEEDS + 10):
+        processor.feed(JFK, None, 100.0 + radius)
+        processor.feed(JFK, None, 20.0)
+    assert len(processor.feeds) == MAX_FEEDS
+    assert processor.feed(JFK, None, 20.0) is jfk
+    assert (JFK.code, None, 100.0) not in processor.feeds
+
+    # Feeds nobody has asked for in FEED_IDLE_SECONDS are dropped on the next request
+    for key, (feed, last_requested) in processor.feeds.items():
+        processor.feeds[key] = (feed, last_requested - FEED_IDLE_SECONDS - 1)
+    processor.feed(JFK, JFK_BBOX, 20.0)
+    assert list(processor.feeds) == [(JFK.code, JFK_BBOX, None)]
+
+
+def test_continent_scale_refresh_cost():
+    states = continent_states(30000, seed=1)
+    started = time.perf_counter()
+    snapshot = Snapshot(FlightColumns.from_response({"time": 1, "states": states}))
+    feeds = [BoardFeed(airport) for airport in AIRPORTS.values()]
+    for feed in feeds:
+        feed.update(snapshot)
+        feed.response()
+    elapsed = time.perf_counter() - started
+    # One refresh for every airport should be well under the 30 s refetch interval
+    assert elapsed < 2.0, elapsed
+
+
+async def _test_board_route_through_proxy():
+    fake, proxy, client = await start_stack(delay=0.1)
+    try:
+        fake.states = [state("abc123", 40.64, -73.70, callsign="JBU1"), state("faraway", 34.0, -118.4)]
+
+        responses = await asyncio.gather(*(
+            client.get("/api/boards/jfk/flights", params={"radius_km": "20"}) for _ in range(200)
+        ))
+        bodies = [await response.json() for response in responses]
+        assert all(response.status == 200 for response in responses)
+        assert len(fake.requests) == 1
+        # The board feed fetches its region once, whatever each board asked for
+        assert fake.requests[0] == {name: f"{float(value):.4f}" for name, value in REGION.items()}
+        assert [f["id"] for f in bodies[0]["upserts"]] == ["abc123"]
+        assert bodies[0]["upserts"][0]["callsign"] == "JBU1"
+
+        since = bodies[0]["version"]
+        response = await client.get("/api/boards/JFK/flights", params={"radius_km": "20", "since": str(since)})
+        assert (await response.json())["upserts"] == []
+
+        response = await client.get("/api/boards/XXX/flights")
+        assert response.status == 404
+
+        fake.fail_with = 429
+        proxy._cache.clear()
+        response = await client.get("/api/boards/JFK/flights")
+        assert response.status == 429
+    finally:
+        await stop_stack(client)
+
+
+def test_board_route_through_proxy():
+    asyncio.run(_test_board_route_through_proxy())
+
+
+async def _test_board_rejects_bad_areas():
+    # Validation runs before the snapshot, so no proxy is needed
+    processor = FlightProcessor(proxy=None, region=())
+    for query in ["radius_km=nan", "radius_km=inf", "radius_km=0", "radius_km=-5",
+                  "lamin=nan&lamax=40.8&lomin=-74.0&lomax=-73.6",
+                  "lamin=40.8&lamax=40.5&lomin=-74.0&lomax=-73.6",
+                  "lamin=40.5&lamax=40.8&lomin=-73.6&lomax=-74.0"]:
+        request = make_mocked_request("GET", f"/api/boards/JFK/flights?{query}", match_info={"airport": "JFK"})
+        response = await processor.handle_board(request)
+        assert response.status == 400, query
+    assert len(processor.feeds) == 0
+
+
+def test_board_rejects_bad_areas():
+    asyncio.run(_test_board_rejects_bad_areas())
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Flight Processing Tests")
+    print("=" * 60)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+
+    print(f"\n✓ All {len(tests)} tests passed!")
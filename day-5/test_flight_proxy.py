@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Tests for flight_proxy.py against a local stand-in for the OpenSky API
+
+The stand-in counts requests and connections and answers slowly enough that
+concurrent board requests overlap, so coalescing is actually exercised.
+
+Run directly (python test_flight_proxy.py) or with pytest.
+"""
+
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from flight_processing import FlightProcessor
+from flight_proxy import FlightProxy, create_app
+
+JFK_BBOX = {"lamin": "40.5", "lamax": "40.8", "lomin": "-74.0", "lomax": "-73.6"}
+LAX_BBOX = {"lamin": "33.8", "lamax": "34.1", "lomin": "-118.6", "lomax": "-118.2"}
+# Board feed region: the continental US
+REGION = {"lamin": "24.0", "lamax": "50.0", "lomin": "-125.0", "lomax": "-66.0"}
+
+BOARDS = 300
+
+
+class FakeOpenSky:
+    """Stand-in for /api/states/all that records what the proxy sends it"""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.requests = []
+        self.peers = set()
+        self.fail_with = None
+        self.retry_after = "10"
+        self.states = [["a1b2c3", "UAL123 ", "United States", 0, 0, -73.78, 40.64, 1000.0,
+                        False, 120.0, 90.0, -5.0, None, 1000.0, None, False, 0]]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(dict(request.query))
+        self.peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(self.delay)
+        if self.fail_with is not None:
+            headers = {"Retry-After": self.retry_after} if self.retry_after else None
+            return web.json_response({"error": "nope"}, status=self.fail_with, headers=headers)
+        return web.json_response({"time": len(self.requests), "states": self.states})
+
+
+async def start_stack(fresh_ttl: float = 20.0, max_stale: float = 120.0, delay: float = 0.2):
+    """Start the fake OpenSky and a proxy in front of it; returns (fake, proxy, client)"""
+    fake = FakeOpenSky(delay=delay)
+    upstream_app = web.Application()
+    upstream_app.router.add_get("/api/states/all", fake.handle)
+    upstream = TestServer(upstream_app)
+    await upstream.start_server()
+
+    proxy = FlightProxy(
+        upstream_url=str(upstream.make_url("/api/states/all")),
+        fresh_ttl=fresh_ttl,
+        max_stale=max_stale,
+    )
+    client = TestClient(TestServer(create_app(proxy, FlightProcessor(proxy, FlightProxy.cache_key(REGION)))))
+    await client.start_server()
+    client.upstream = upstream
+    return fake, proxy, client
+
+
+async def stop_stack(client: TestClient):
+    await client.close()
+    await client.upstream.close()
+
+
+async def fetch(client: TestClient, bbox: dict):
+    response = await client.get("/api/states/all", params=bbox)
+    return response.status, response.headers.get("X-Cache"), await response.read()
+
+
+async def _test_concurrent_boards_share_one_upstream_request():
+    fake, proxy, client = await start_stack()
+    try:
+        results = await asyncio.gather(*(fetch(client, JFK_BBOX) for _ in range(BOARDS)))
+        assert len(fake.requests) == 1, fake.requests
+        assert all(status == 200 for status, _, _ in results)
+        assert len({body for _, _, body in results}) == 1
+        assert json.loads(results[0][2])["states"][0][0] == "a1b2c3"
+        assert fake.requests[0] == {"lamin": "40.5000", "lamax": "40.8000",
+                                    "lomin": "-74.0000", "lomax": "-73.6000"}
+    finally:
+        await stop_stack(client)
+
+
+async def _test_fresh_entries_are_served_from_cache():
+    fake, proxy, client = await start_stack()
+    try:
+        _, first, _ = await fetch(client, JFK_BBOX)
+        results = await asyncio.gather(*(fetch(client, JFK_BBOX) for _ in range(BOARDS)))
+        assert first == "MISS"
+        assert {cache for _, cache, _ in results} == {"HIT"}
+        assert len(fake.requests) == 1
+    finally:
+        await stop_stack(client)
+
+
+async def _test_equivalent_bboxes_share_a_cache_entry():
+    fake, proxy, client = await start_stack()
+    try:
+        padded = {name: value + "0" for name, value in JFK_BBOX.items()}
+        await asyncio.gather(fetch(client, JFK_BBOX), fetch(client, padded), fetch(client, LAX_BBOX))
+        assert len(fake.requests) == 2
+    finally:
+        await stop_stack(client)
+
+
+async def _test_stale_while_revalidate():
+    fake, proxy, client = await start_stack(fresh_ttl=0.5)
+    try:
+        _, _, first_body = await fetch(client, JFK_BBOX)
+        await asyncio.sleep(0.55)
+
+        # Stale: every board gets the old data immediately, one refresh runs
+        results = await asyncio.gather(*(fetch(client, JFK_BBOX) for _ in range(BOARDS)))
+        assert {cache for _, cache, _ in results} == {"STALE"}
+        assert {body for _, _, body in results} == {first_body}
+
+        # Wait for the background refresh rather than sleeping past it
+        await asyncio.gather(*proxy._inflight.values())
+        _, cache, body = await fetch(client, JFK_BBOX)
+        assert cache == "HIT"
+        assert json.loads(body)["time"] == 2
+        assert len(fake.requests) == 2
+    finally:
+        await stop_stack(client)
+
+
+async def _test_upstream_connections_are_reused():
+    fake, proxy, client = await start_stack(fresh_ttl=0, max_stale=0, delay=0)
+    try:
+        for _ in range(5):
+            status, cache, _ = await fetch(client, JFK_BBOX)
+            assert (status, cache) == (200, "MISS")
+        assert len(fake.requests) == 5
+        assert len(fake.peers) == 1
+    finally:
+        await stop_stack(client)
+
+
+async def _test_upstream_errors():
+    fake, proxy, client = await start_stack(fresh_ttl=0.1, delay=0)
+    try:
+        fake.fail_with = 429
+        response = await client.get("/api/states/all", params=JFK_BBOX)
+        assert response.status == 429
+        assert response.headers["Retry-After"] == "10"
+
+        # Once something is cached, upstream failures fall back to it
+        fake.fail_with = None
+        _, _, good_body = await fetch(client, LAX_BBOX)
+        fake.fail_with = 500
+        await asyncio.sleep(0.15)
+        for _ in range(2):
+            status, cache, body = await fetch(client, LAX_BBOX)
+            assert (status, cache, body) == (200, "STALE", good_body)
+            await asyncio.sleep(0.05)
+
+        requests_before = len(fake.requests)
+        for junk in ("north", "nan", "inf", "-Infinity"):
+            response = await client.get("/api/states/all", params={**JFK_BBOX, "lamin": junk})
+            assert response.status == 400
+        assert len(fake.requests) == requests_before
+    finally:
+        await stop_stack(client)
+
+
+async def _test_upstream_backoff():
+    fake, proxy, client = await start_stack(fresh_ttl=0.05, delay=0)
+    try:
+        # Cold: one failed fetch, then the error is repeated without going upstream
+        fake.fail_with = 429
+        for _ in range(20):
+            response = await client.get("/api/states/all", params=JFK_BBOX)
+            assert response.status == 429
+            assert 1 <= int(response.headers["Retry-After"]) <= 10
+            await asyncio.sleep(0.01)
+        assert len(fake.requests) == 1
+
+        # Stale: one failed refresh, then the stale entry is served during the cooldown
+        fake.fail_with = None
+        _, _, good_body = await fetch(client, LAX_BBOX)
+        fake.fail_with = 429
+        await asyncio.sleep(0.1)
+        for _ in range(20):
+            assert await fetch(client, LAX_BBOX) == (200, "STALE", good_body)
+            await asyncio.sleep(0.01)
+        assert len(fake.requests) == 3
+
+        # Without Retry-After the default cooldown applies, then upstream is tried again
+        proxy.error_cooldown = 0.2
+        fake.retry_after = None
+        fake.fail_with = 500
+        bos = {"lamin": "42.2", "lamax": "42.5", "lomin": "-71.2", "lomax": "-70.8"}
+        for _ in range(5):
+            assert (await client.get("/api/states/all", params=bos)).status == 502
+        assert len(fake.requests) == 4
+        fake.fail_with = None
+        await asyncio.sleep(0.25)
+        assert (await fetch(client, bos))[:2] == (200, "MISS")
+        assert len(fake.requests) == 5
+    finally:
+        await stop_stack(client)
+
+
+def test_concurrent_boards_share_one_upstream_request():
+    asyncio.run(_test_concurrent_boards_share_one_upstream_request())
+
+
+def test_fresh_entries_are_served_from_cache():
+    asyncio.run(_test_fresh_entries_are_served_from_cache())
+
+
+def test_equivalent_bboxes_share_a_cache_entry():
+    asyncio.run(_test_equivalent_bboxes_share_a_cache_entry())
+
+
+def test_stale_while_revalidate():
+    asyncio.run(_test_stale_while_revalidate())
+
+
+def test_upstream_connections_are_reused():
+    asyncio.run(_test_upstream_connections_are_reused())
+
+
+def test_upstream_errors():
+    asyncio.run(_test_upstream_errors())
+
+
+def test_upstream_backoff():
+    asyncio.run(_test_upstream_backoff())
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Flight Proxy Tests")
+    print("=" * 60)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+
+    print(f"\n✓ All {len(tests)} tests passed!")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for gesture_detection.py and tune_gesture_thresholds.py
+
+Hand-built landmark frames are checked against the detectGesture priority
+in homecoming-board/src/utils/gestureDetection.ts, then a small threshold
+search runs on a synthetic labeled recording.
+
+Run directly (python test_gesture_detection.py) or with pytest.
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from gesture_detection import (
+    CLOSED_FIST,
+    DEFAULT_THRESHOLDS,
+    GESTURE_NAMES,
+    OPEN_PALM,
+    THUMBS_DOWN,
+    THUMBS_UP,
+    UNKNOWN,
+    array_to_thresholds,
+    classify_gestures,
+    debounce_gestures,
+    extract_features,
+    finger_curl_ratios,
+)
+from tune_gesture_thresholds import load_recordings, search
+
+WRIST = (0.5, 0.8)
+THUMB_MCP = (0.4, 0.7)
+# MCP x positions for index, middle, ring, pinky; all 0.2 above the wrist
+FINGER_X = [0.45, 0.5, 0.55, 0.6]
+
+
+def hand(fingers_curled: bool, thumb_tip) -> np.ndarray:
+    """
+    One (21, 3) frame. Extended fingertips sit 1.8x the MCP distance from the
+    wrist (curl 0); curled ones sit closer than the MCP (curl 1).
+    """
+    points = np.tile([*WRIST, 0.0], (21, 1))
+    points[2, :2] = THUMB_MCP
+    points[4, :2] = thumb_tip
+    for finger, x in enumerate(FINGER_X):
+        mcp, tip = 5 + finger * 4, 8 + finger * 4
+        points[mcp, :2] = (x, 0.6)
+        points[tip, :2] = (x, 0.68) if fingers_curled else (x, 0.44)
+    return points
+
+
+PALM = hand(fingers_curled=False, thumb_tip=(0.25, 0.6))
+FIST = hand(fingers_curled=True, thumb_tip=(0.48, 0.66))
+THUMBS_UP_FRAME = hand(fingers_curled=True, thumb_tip=(0.42, 0.45))
+THUMBS_DOWN_FRAME = hand(fingers_curled=True, thumb_tip=(0.42, 1.1))
+
+
+def test_curl_ratios():
+    curls = finger_curl_ratios(np.stack([PALM, FIST]))
+    assert curls.shape == (2, 5)
+    assert np.allclose(curls[0, :4], 0)
+    assert np.allclose(curls[1, :4], 1)
+
+
+def test_classification_matches_detect_gesture_priority():
+    frames = np.stack([PALM, FIST, THUMBS_UP_FRAME, THUMBS_DOWN_FRAME])
+    assert classify_gestures(frames).tolist() == [OPEN_PALM, CLOSED_FIST, THUMBS_UP, THUMBS_DOWN]
+
+    # A thumbs up is also a fist; it only wins because it is checked first
+    no_thumbs_up = {**DEFAULT_THRESHOLDS, "thumbsUpThumbExtend": 0.0}
+    assert classify_gestures(THUMBS_UP_FRAME, no_thumbs_up).tolist() == [CLOSED_FIST]
+
+
+def test_degenerate_frames():
+    # Every landmark on the wrist: 0/0 gives NaN curls, which fail every
+    # comparison just like NaN does in the TS
+    collapsed = np.tile([*WRIST, 0.0], (21, 1))
+    assert np.isnan(finger_curl_ratios(collapsed)).all()
+    assert classify_gestures(collapsed).tolist() == [UNKNOWN]
+
+    # Index MCP on the wrist with the tip away: x/0 = inf, clamped to curl 0
+    frame = FIST.copy()
+    frame[5, :2] = WRIST
+    assert finger_curl_ratios(frame)[0, 0] == 0
+    # Three curled fingers are still enough for a fist
+    assert classify_gestures(frame).tolist() == [CLOSED_FIST]
+
+
+def test_debounce_gestures():
+    gestures = np.array([CLOSED_FIST, CLOSED_FIST, CLOSED_FIST, UNKNOWN, OPEN_PALM, OPEN_PALM, CLOSED_FIST])
+    timestamps = np.array([0, 100, 400, 450, 500, 600, 700])
+    assert debounce_gestures(gestures, timestamps, debounce_ms=300) == [0, 2, 4, 6]
+
+
+def synthetic_recording(count: int = 400, seed: int = 0):
+    """Jittered copies of the template frames, labeled with their gesture"""
+    rng = np.random.default_rng(seed)
+    templates = [(PALM, OPEN_PALM), (FIST, CLOSED_FIST), (THUMBS_UP_FRAME, THUMBS_UP),
+                 (THUMBS_DOWN_FRAME, THUMBS_DOWN)]
+    picks = rng.integers(0, len(templates), count)
+    landmarks = np.stack([templates[i][0] for i in picks]) + rng.normal(0, 0.01, (count, 21, 3))
+    labels = np.array([templates[i][1] for i in picks], dtype=np.int8)
+    return landmarks, labels
+
+
+def test_load_recordings_formats():
+    landmarks, labels = synthetic_recording(count=6)
+    names = [GESTURE_NAMES[code] for code in labels]
+    with tempfile.TemporaryDirectory() as tmp:
+        npz_path = os.path.join(tmp, "rec.npz")
+        json_path = os.path.join(tmp, "rec.json")
+        np.savez(npz_path, landmarks=landmarks, labels=np.array(names))
+        with open(json_path, "w") as f:
+            json.dump({"frames": [
+                {"landmarks": [{"x": x, "y": y, "z": z} for x, y, z in frame.tolist()], "label": name}
+                for frame, name in zip(landmarks, names)
+            ]}, f)
+
+        loaded, loaded_labels = load_recordings([npz_path, json_path])
+
+    assert loaded.shape == (12, 21, 2)
+    assert np.allclose(loaded[:6], landmarks[:, :, :2])
+    assert np.allclose(loaded[6:], landmarks[:, :, :2])
+    assert loaded_labels.tolist() == labels.tolist() * 2
+
+
+def test_search_finds_thresholds_in_parallel():
+    landmarks, labels = synthetic_recording()
+    features = extract_features(landmarks)
+    rng = np.random.default_rng(1)
+    candidates = np.column_stack([
+        rng.uniform(0.2, 0.8, 300), rng.integers(2, 5, 300), rng.uniform(0.1, 0.5, 300),
+        rng.uniform(1.0, 2.0, 300), rng.uniform(0.3, 0.8, 300), rng.uniform(0.1, 0.5, 300),
+        rng.integers(2, 5, 300), rng.uniform(0.0, 0.15, 300), rng.uniform(0.05, 0.3, 300),
+    ]).astype(np.float64)
+
+    serial = search(features, labels, candidates, workers=1)
+    parallel = search(features, labels, candidates, workers=2)
+
+    assert serial == parallel
+    best_score, _, best_values = serial[0]
+    assert best_score == 1.0
+    assert (classify_gestures(landmarks, array_to_thresholds(best_values)) == labels).all()
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Gesture Detection Tests")
+    print("=" * 60)
+
+    tests = [value for name, value in list(globals().items()) if name.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✓ {test.__name__}")
+
+    print(f"\n✓ All {len(tests)} tests passed!")
@@ -1,73 +1,337 @@
 #!/usr/bin/env python3
 """
-Simple test script to verify MediaPipe installation
+Simple test script to verify MediaPipe installation, plus a per-stage
+latency profiler for the hand-tracking frame pipeline.
+
+The PRD targets 30-60 FPS, i.e. a 16-33 ms frame budget. The profiler times
+each stage of a frame:
+- acquire:  grab a frame from a synthetic, recorded or camera source
+- convert:  BGR -> RGB color conversion
+- process:  Hands.process (detection + landmark model)
+- landmarks: post-process results into a (hands, 21, 3) array
+- classify: gesture classification (gesture_detection.py, same math as the board)
+
+and reports p50/p95/p99 per stage and end to end for every combination of
+static_image_mode, max_num_hands and input resolution.
+
+Usage:
+    python test_mediapipe.py                                 # install check + quick synthetic profile
+    python test_mediapipe.py --source recording.mp4 --frames 300
+    python test_mediapipe.py --source 0 --resolutions 640x480 --max-hands 1
+    python test_mediapipe.py --skip-profile
 """
 
+import argparse
+import itertools
+import time
+from typing import Dict, Iterator, List, Tuple
+
 import mediapipe as mp
 import cv2
 import numpy as np
 
-print("=" * 60)
-print("MediaPipe Installation Test")
-print("=" * 60)
-
-# Check versions
-print(f"\nMediaPipe version: {mp.__version__}")
-print(f"OpenCV version: {cv2.__version__}")
-print(f"NumPy version: {np.__version__}")
-
-# Test MediaPipe solutions availability
-print("\n" + "-" * 60)
-print("Available MediaPipe Solutions:")
-print("-" * 60)
-
-solutions = {
-    "Face Detection": hasattr(mp.solutions, 'face_detection'),
-    "Face Mesh": hasattr(mp.solutions, 'face_mesh'),
-    "Hands": hasattr(mp.solutions, 'hands'),
-    "Pose": hasattr(mp.solutions, 'pose'),
-    "Holistic": hasattr(mp.solutions, 'holistic'),
-    "Objectron": hasattr(mp.solutions, 'objectron'),
-    "Selfie Segmentation": hasattr(mp.solutions, 'selfie_segmentation'),
+from gesture_detection import classify_gestures
+
+STAGES = ["acquire", "convert", "process", "landmarks", "classify"]
+PERCENTILES = [50, 95, 99]
+
+# Mirrors DEFAULT_HAND_CONFIG in homecoming-board/src/types/hand.ts
+BOARD_HAND_CONFIG = {
+    "model_complexity": 1,
+    "min_detection_confidence": 0.7,
+    "min_tracking_confidence": 0.5,
 }
 
-for solution, available in solutions.items():
-    status = "✓ Available" if available else "✗ Not Available"
-    print(f"{solution:<25} {status}")
-
-# Test basic MediaPipe functionality with a simple hands detection setup
-print("\n" + "-" * 60)
-print("Testing MediaPipe Hands Detection (without webcam):")
-print("-" * 60)
-
-try:
-    # Initialize MediaPipe Hands
-    mp_hands = mp.solutions.hands
-    hands = mp_hands.Hands(
-        static_image_mode=True,
-        max_num_hands=2,
-        min_detection_confidence=0.5
+
+def check_installation() -> bool:
+    """Print versions and run a single blank-frame Hands.process"""
+    print("=" * 60)
+    print("MediaPipe Installation Test")
+    print("=" * 60)
+
+    # Check versions
+    print(f"\nMediaPipe version: {mp.__version__}")
+    print(f"OpenCV version: {cv2.__version__}")
+    print(f"NumPy version: {np.__version__}")
+
+    # Test MediaPipe solutions availability
+    print("\n" + "-" * 60)
+    print("Available MediaPipe Solutions:")
+    print("-" * 60)
+
+    solutions = {
+        "Face Detection": hasattr(mp.solutions, 'face_detection'),
+        "Face Mesh": hasattr(mp.solutions, 'face_mesh'),
+        "Hands": hasattr(mp.solutions, 'hands'),
+        "Pose": hasattr(mp.solutions, 'pose'),
+        "Holistic": hasattr(mp.solutions, 'holistic'),
+        "Objectron": hasattr(mp.solutions, 'objectron'),
+        "Selfie Segmentation": hasattr(mp.solutions, 'selfie_segmentation'),
+    }
+
+    for solution, available in solutions.items():
+        status = "✓ Available" if available else "✗ Not Available"
+        print(f"{solution:<25} {status}")
+
+    # Test basic MediaPipe functionality with a simple hands detection setup
+    print("\n" + "-" * 60)
+    print("Testing MediaPipe Hands Detection (without webcam):")
+    print("-" * 60)
+
+    try:
+        # Initialize MediaPipe Hands
+        mp_hands = mp.solutions.hands
+        hands = mp_hands.Hands(
+            static_image_mode=True,
+            max_num_hands=2,
+            min_detection_confidence=0.5
+        )
+
+        # Create a blank test image
+        test_image = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        # Process the image (should return no detections on blank image)
+        results = hands.process(cv2.cvtColor(test_image, cv2.COLOR_BGR2RGB))
+
+        print("✓ MediaPipe Hands initialized successfully")
+        print(f"  - Test image processed without errors")
+        print(f"  - Detections on blank image: {results.multi_hand_landmarks is not None}")
+
+        # Clean up
+        hands.close()
+
+        print("\n✓ All tests passed! MediaPipe is working correctly.")
+        return True
+
+    except Exception as e:
+        print(f"\n✗ Error during testing: {str(e)}")
+        print("MediaPipe may not be configured correctly.")
+        return False
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    """Parse "640x480" into (width, height)"""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def synthetic_frames(width: int, height: int, seed: int = 0) -> Iterator[np.ndarray]:
+    """
+    Endless BGR frames of smooth noise at the requested resolution
+
+    A small pool of frames is generated up front and copied out per frame, so
+    "acquire" costs roughly what a camera buffer copy does rather than what
+    random number generation does.
+    """
+    rng = np.random.default_rng(seed)
+    pool = []
+    for _ in range(8):
+        small = rng.integers(0, 256, size=(height // 8 or 1, width // 8 or 1, 3), dtype=np.uint8)
+        pool.append(cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR))
+    for frame in itertools.cycle(pool):
+        yield frame.copy()
+
+
+def capture_frames(source, width: int, height: int) -> Iterator[np.ndarray]:
+    """
+    Frames from a recorded video (looped) or a camera index, resized to the
+    requested resolution so every config sees the same content
+    """
+    is_camera = isinstance(source, int)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise RuntimeError(f"Could not open video source: {source}")
+    if is_camera:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    try:
+        rewound = False
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                if is_camera:
+                    raise RuntimeError(f"Camera {source} stopped returning frames")
+                # Images and empty videos can't be rewound; don't spin on them
+                if rewound:
+                    raise RuntimeError(f"No frames could be read from {source} after rewinding")
+                # Loop recordings so long runs don't run out of frames
+                capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                rewound = True
+                continue
+            rewound = False
+            if frame.shape[1] != width or frame.shape[0] != height:
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            yield frame
+    finally:
+        capture.release()
+
+
+def results_to_landmarks(results) -> np.ndarray:
+    """Convert Hands.process results into a (hands, 21, 3) array"""
+    if not results.multi_hand_landmarks:
+        return np.empty((0, 21, 3), dtype=np.float64)
+    return np.array(
+        [[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in results.multi_hand_landmarks],
+        dtype=np.float64,
+    )
+
+
+def profile_config(
+    source,
+    resolution: Tuple[int, int],
+    static_image_mode: bool,
+    max_num_hands: int,
+    frames: int,
+    warmup: int,
+) -> Dict[str, object]:
+    """Run one pipeline config and collect per-stage timings in milliseconds"""
+    width, height = resolution
+    if source == "synthetic":
+        frame_source = synthetic_frames(width, height)
+    else:
+        frame_source = capture_frames(source, width, height)
+
+    hands = mp.solutions.hands.Hands(
+        static_image_mode=static_image_mode,
+        max_num_hands=max_num_hands,
+        **BOARD_HAND_CONFIG,
     )
-    
-    # Create a blank test image
-    test_image = np.zeros((480, 640, 3), dtype=np.uint8)
-    
-    # Process the image (should return no detections on blank image)
-    results = hands.process(cv2.cvtColor(test_image, cv2.COLOR_BGR2RGB))
-    
-    print("✓ MediaPipe Hands initialized successfully")
-    print(f"  - Test image processed without errors")
-    print(f"  - Detections on blank image: {results.multi_hand_landmarks is not None}")
-    
-    # Clean up
-    hands.close()
-    
-    print("\n✓ All tests passed! MediaPipe is working correctly.")
-    
-except Exception as e:
-    print(f"\n✗ Error during testing: {str(e)}")
-    print("MediaPipe may not be configured correctly.")
-
-print("\n" + "=" * 60)
-print("Test Complete")
-print("=" * 60)
+
+    timings = {stage: [] for stage in STAGES + ["total"]}
+    frames_with_hands = 0
+
+    try:
+        for index in range(warmup + frames):
+            t0 = time.perf_counter()
+            frame = next(frame_source)
+            t1 = time.perf_counter()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            t2 = time.perf_counter()
+            results = hands.process(rgb)
+            t3 = time.perf_counter()
+            landmarks = results_to_landmarks(results)
+            t4 = time.perf_counter()
+            if len(landmarks):
+                classify_gestures(landmarks)
+            t5 = time.perf_counter()
+
+            # First frames include graph setup and model loading
+            if index < warmup:
+                continue
+
+            for stage, start, end in zip(STAGES, (t0, t1, t2, t3, t4), (t1, t2, t3, t4, t5)):
+                timings[stage].append((end - start) * 1000)
+            timings["total"].append((t5 - t0) * 1000)
+            frames_with_hands += bool(len(landmarks))
+    finally:
+        hands.close()
+        frame_source.close()
+
+    return {
+        "resolution": f"{width}x{height}",
+        "static_image_mode": static_image_mode,
+        "max_num_hands": max_num_hands,
+        "frames": frames,
+        "detection_rate": frames_with_hands / frames if frames else 0.0,
+        "percentiles": {
+            stage: np.percentile(values, PERCENTILES).tolist()
+            for stage, values in timings.items()
+        },
+    }
+
+
+def print_config_report(report: Dict[str, object], budget_ms: float):
+    """Per-stage p50/p95/p99 table for one config"""
+    print(f"\n{report['resolution']}  static_image_mode={report['static_image_mode']}  "
+          f"max_num_hands={report['max_num_hands']}  "
+          f"(hands in {report['detection_rate']:.0%} of {report['frames']} frames)")
+    print(f"  {'stage':<10} " + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES))
+    for stage, values in report["percentiles"].items():
+        print(f"  {stage:<10} " + " ".join(f"{v:>6.2f}ms" for v in values))
+
+    p95_total = report["percentiles"]["total"][1]
+    status = "✓ within" if p95_total <= budget_ms else "✗ over"
+    print(f"  {status} {budget_ms:.0f} ms budget at p95 ({1000 / p95_total:.0f} FPS)")
+
+
+def print_summary(reports: List[Dict[str, object]], budget_ms: float):
+    """Compare all configs by end-to-end p95"""
+    print("\n" + "-" * 60)
+    print(f"Summary (sorted by end-to-end p95, budget {budget_ms:.0f} ms):")
+    print("-" * 60)
+    print(f"{'resolution':<11} {'static':<7} {'hands':<6} {'p50':>8} {'p95':>8} {'p99':>8}  budget")
+    for report in sorted(reports, key=lambda r: r["percentiles"]["total"][1]):
+        p50, p95, p99 = report["percentiles"]["total"]
+        fits = "✓" if p95 <= budget_ms else "✗"
+        print(f"{report['resolution']:<11} {str(report['static_image_mode']):<7} "
+              f"{report['max_num_hands']:<6} {p50:>6.2f}ms {p95:>6.2f}ms {p99:>6.2f}ms  {fits}")
+
+    if any(report["detection_rate"] == 0 for report in reports):
+        print("\nNote: configs with no detected hands skip landmark post-processing and")
+        print("classification, and tracking mode never gets to reuse a previous hand.")
+        print("Profile a recording of someone gesturing (--source) for realistic numbers.")
+
+
+def profile_pipeline(args) -> List[Dict[str, object]]:
+    """Profile every combination of the requested settings"""
+    print("\n" + "=" * 60)
+    print("Hand-Tracking Pipeline Latency Profile")
+    print("=" * 60)
+
+    source = args.source
+    if source.isdigit():
+        source = int(source)
+    print(f"\nSource: {source}  |  {args.frames} frames per config after {args.warmup} warmup")
+
+    reports = []
+    for resolution, static_mode, max_hands in itertools.product(
+        args.resolutions, args.static_modes, args.max_hands
+    ):
+        report = profile_config(source, resolution, static_mode, max_hands, args.frames, args.warmup)
+        print_config_report(report, args.budget_ms)
+        reports.append(report)
+
+    print_summary(reports, args.budget_ms)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MediaPipe install check and hand-tracking latency profiler")
+    parser.add_argument("--source", default="synthetic",
+                        help='"synthetic", a video file path, or a camera index (default: synthetic)')
+    parser.add_argument("--frames", type=positive_int, default=100, help="timed frames per config (default: 100)")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed frames per config (default: 10)")
+    parser.add_argument("--resolutions", type=lambda s: [parse_resolution(r) for r in s.split(",")],
+                        default=[(320, 240), (640, 480), (1280, 720)],
+                        help="comma-separated WxH list (default: 320x240,640x480,1280x720)")
+    parser.add_argument("--max-hands", type=lambda s: [int(n) for n in s.split(",")], default=[1, 2],
+                        help="comma-separated max_num_hands values (default: 1,2)")
+    parser.add_argument("--static-modes", type=lambda s: [m.strip().lower() == "true" for m in s.split(",")],
+                        default=[False, True],
+                        help="comma-separated static_image_mode values (default: false,true)")
+    parser.add_argument("--budget-ms", type=float, default=33.0,
+                        help="frame budget to check p95 against (default: 33 = 30 FPS)")
+    parser.add_argument("--skip-profile", action="store_true", help="only run the installation test")
+    args = parser.parse_args()
+
+    installed = check_installation()
+
+    if installed and not args.skip_profile:
+        profile_pipeline(args)
+
+    print("\n" + "=" * 60)
+    print("Test Complete")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Offline threshold search for the Homecoming Board gestures
+
+Scores every candidate GestureThresholds set against labeled hand landmark
+recordings and writes the best one as JSON the board can load from its
+`gesture-thresholds` localStorage key.
+
+Recordings are either:
+- .npz files with `landmarks` (frames, 21, 3) and `labels` (frames,) arrays
+- .json files holding a list of {"landmarks": [...], "label": "CLOSED_FIST"}
+  frames (or {"frames": [...]}); landmarks may be [x, y, z] lists or the
+  {x, y, z} objects MediaPipe returns in the browser
+
+Labels use the board's GestureType names. Frames labeled UNKNOWN count too,
+so thresholds get penalized for firing on "no gesture" poses.
+
+Usage:
+    python tune_gesture_thresholds.py recordings/*.npz --mode random --samples 50000
+    python tune_gesture_thresholds.py recordings/*.json --mode grid --grid-steps 4
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from gesture_detection import (
+    DEFAULT_THRESHOLDS,
+    GESTURE_CODES,
+    GESTURE_NAMES,
+    THRESHOLD_FIELDS,
+    array_to_thresholds,
+    as_landmark_array,
+    classify_features,
+    extract_features,
+    thresholds_to_array,
+)
+
+
+# (min, max, step) per field; mirrors the sliders in GestureTuning.tsx.
+# thumbsUpMinFingers has no slider, so it gets the same range as fistMinFingers.
+SEARCH_SPACE: Dict[str, Tuple[float, float, float]] = {
+    "fistCurlThreshold": (0.0, 1.0, 0.05),
+    "fistMinFingers": (2, 4, 1),
+    "palmExtendThreshold": (0.0, 1.0, 0.05),
+    "palmThumbMultiplier": (1.0, 2.0, 0.1),
+    "thumbsUpFingerCurl": (0.3, 0.8, 0.05),
+    "thumbsUpThumbExtend": (0.1, 0.5, 0.05),
+    "thumbsUpMinFingers": (2, 4, 1),
+    "thumbsUpYThreshold": (0.0, 0.15, 0.01),
+    "thumbsUpXThreshold": (0.05, 0.3, 0.01),
+}
+
+# Elements allowed in each (batch, frames, 4) boolean temporary. Batch size
+# is derived from the frame count so memory per worker stays flat as
+# recordings grow
+CHUNK_ELEMENTS = 1 << 23
+
+# Worker state, set once per process by _init_worker
+_features: Optional[Dict[str, np.ndarray]] = None
+_labels: Optional[np.ndarray] = None
+
+
+def _landmarks_from_json(frame_landmarks) -> List[List[float]]:
+    """Accept either [x, y, z] lists or MediaPipe-style {x, y, z} objects"""
+    points = []
+    for point in frame_landmarks:
+        if isinstance(point, dict):
+            points.append([point["x"], point["y"], point.get("z", 0.0)])
+        else:
+            points.append(list(point)[:3] + [0.0] * (3 - len(point)))
+    return points
+
+
+def load_recording(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Load one labeled recording as (landmarks, label codes)"""
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as data:
+            landmarks = as_landmark_array(data["landmarks"])
+            label_names = [str(label) for label in data["labels"]]
+    else:
+        with open(path, "r") as f:
+            data = json.load(f)
+        frames = data["frames"] if isinstance(data, dict) else data
+        landmarks = as_landmark_array([_landmarks_from_json(frame["landmarks"]) for frame in frames])
+        label_names = [frame["label"] for frame in frames]
+
+    unknown_labels = sorted(set(label_names) - set(GESTURE_CODES))
+    if unknown_labels:
+        raise ValueError(f"{path}: unknown gesture labels {unknown_labels}")
+    if len(label_names) != len(landmarks):
+        raise ValueError(f"{path}: {len(landmarks)} frames but {len(label_names)} labels")
+
+    labels = np.array([GESTURE_CODES[name] for name in label_names], dtype=np.int8)
+    return landmarks, labels
+
+
+def load_recordings(paths: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate several recordings into one dataset"""
+    loaded = [load_recording(path) for path in paths]
+    # Only x and y feed the gesture math, so 2D and 3D recordings can be mixed
+    landmarks = np.concatenate([lm[:, :21, :2] for lm, _ in loaded])
+    labels = np.concatenate([labels for _, labels in loaded])
+    return landmarks, labels
+
+
+def score_predictions(predictions: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    Balanced accuracy of (K, frames) predictions against (frames,) labels
+
+    Averaging recall per labeled gesture keeps a recording with lots of open
+    palms from drowning out the rarer thumbs-up frames.
+    """
+    correct = predictions == labels[np.newaxis]
+    recalls = [correct[:, labels == code].mean(axis=1) for code in np.unique(labels)]
+    return np.mean(recalls, axis=0)
+
+
+def per_gesture_recall(predictions: np.ndarray, labels: np.ndarray) -> Dict[str, float]:
+    """Recall per labeled gesture for a single (frames,) prediction"""
+    return {
+        GESTURE_NAMES[code]: float((predictions[labels == code] == code).mean())
+        for code in np.unique(labels)
+    }
+
+
+def field_values(field: str, grid_steps: int) -> np.ndarray:
+    """Values tried for one field in grid mode"""
+    low, high, step = SEARCH_SPACE[field]
+    if field.endswith("MinFingers"):
+        return np.arange(low, high + 1, dtype=np.float64)
+    return np.unique(np.round(np.linspace(low, high, grid_steps) / step) * step)
+
+
+def grid_candidates(grid_steps: int) -> Tuple[Iterator[Tuple[float, ...]], int]:
+    """Lazily enumerate the full grid; returns (iterator, total count)"""
+    axes = [field_values(field, grid_steps) for field in THRESHOLD_FIELDS]
+    total = int(np.prod([len(axis) for axis in axes]))
+    return itertools.product(*axes), total
+
+
+def random_candidates(samples: int, seed: int) -> np.ndarray:
+    """Uniform samples over SEARCH_SPACE, snapped to each slider's step"""
+    rng = np.random.default_rng(seed)
+    columns = []
+    for field in THRESHOLD_FIELDS:
+        low, high, step = SEARCH_SPACE[field]
+        if field.endswith("MinFingers"):
+            columns.append(rng.integers(low, high + 1, size=samples).astype(np.float64))
+        else:
+            values = np.round(rng.uniform(low, high, size=samples) / step) * step
+            columns.append(np.clip(values, low, high))
+    candidates = np.stack(columns, axis=1)
+    # Always include the board's defaults as a baseline candidate
+    return np.vstack([thresholds_to_array(DEFAULT_THRESHOLDS), candidates])
+
+
+def chunk_size(frames: int) -> int:
+    """Candidates per batch for a dataset of `frames` frames"""
+    return max(1, CHUNK_ELEMENTS // (max(frames, 1) * 4))
+
+
+def chunked(candidates, size: int) -> Iterator[np.ndarray]:
+    """Split an array or lazy iterator of candidates into (<=size, 9) arrays"""
+    if isinstance(candidates, np.ndarray):
+        for start in range(0, len(candidates), size):
+            yield candidates[start:start + size]
+        return
+    iterator = iter(candidates)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield np.array(batch, dtype=np.float64)
+
+
+def _init_worker(features: Dict[str, np.ndarray], labels: np.ndarray):
+    global _features, _labels
+    _features = features
+    _labels = labels
+
+
+def _default_distance(candidates: np.ndarray) -> np.ndarray:
+    """Normalized distance from the defaults, used to break score ties"""
+    spans = np.array([SEARCH_SPACE[f][1] - SEARCH_SPACE[f][0] for f in THRESHOLD_FIELDS])
+    return np.linalg.norm((candidates - thresholds_to_array(DEFAULT_THRESHOLDS)) / spans, axis=1)
+
+
+def _evaluate_chunk(candidates: np.ndarray, top_k: int = 5) -> List[Tuple[float, float, List[float]]]:
+    """Score one batch and keep its best candidates"""
+    scores = score_predictions(classify_features(_features, candidates), _labels)
+    distances = _default_distance(candidates)
+    # Highest score first; among ties, the candidate closest to the defaults
+    order = np.lexsort((distances, -scores))[:top_k]
+    return [(float(scores[i]), float(distances[i]), candidates[i].tolist()) for i in order]
+
+
+def search(
+    features: Dict[str, np.ndarray],
+    labels: np.ndarray,
+    candidates,
+    workers: int,
+    top_k: int = 5,
+) -> List[Tuple[float, float, List[float]]]:
+    """Evaluate candidate batches in parallel and return the overall top_k"""
+    batches = chunked(candidates, chunk_size(len(labels)))
+    results: List[Tuple[float, float, List[float]]] = []
+
+    if workers <= 1:
+        _init_worker(features, labels)
+        for batch in batches:
+            results.extend(_evaluate_chunk(batch, top_k))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(features, labels),
+        ) as pool:
+            # pool.map would submit (and so build) every batch up front; keep
+            # only a few per worker in flight so the grid stays lazy
+            pending = collections.deque()
+            for batch in batches:
+                pending.append(pool.submit(_evaluate_chunk, batch, top_k))
+                if len(pending) >= 2 * workers:
+                    results.extend(pending.popleft().result())
+            while pending:
+                results.extend(pending.popleft().result())
+
+    results.sort(key=lambda result: (-result[0], result[1]))
+    return results[:top_k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search gesture thresholds against labeled recordings")
+    parser.add_argument("recordings", nargs="+", help=".npz or .json labeled landmark recordings")
+    parser.add_argument("--mode", choices=["grid", "random"], default="random")
+    parser.add_argument("--grid-steps", type=int, default=3,
+                        help="values per continuous field in grid mode (default: 3)")
+    parser.add_argument("--samples", type=int, default=20000,
+                        help="candidates to try in random mode (default: 20000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default="gesture-thresholds.json")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Gesture Threshold Search")
+    print("=" * 60)
+
+    landmarks, labels = load_recordings(args.recordings)
+    features = extract_features(landmarks)
+
+    counts = {GESTURE_NAMES[code]: int((labels == code).sum()) for code in np.unique(labels)}
+    print(f"\nLoaded {len(labels)} frames from {len(args.recordings)} recording(s): {counts}")
+
+    if args.mode == "grid":
+        candidates, total = grid_candidates(args.grid_steps)
+    else:
+        candidates = random_candidates(args.samples, args.seed)
+        total = len(candidates)
+    print(f"Evaluating {total:,} candidates ({args.mode}) on {args.workers} worker(s)...")
+
+    top = search(features, labels, candidates, args.workers)
+    best_score, _, best_values = top[0]
+    best = array_to_thresholds(best_values)
+
+    default_predictions = classify_features(features, thresholds_to_array(DEFAULT_THRESHOLDS))[0]
+    best_predictions = classify_features(features, thresholds_to_array(best))[0]
+    default_score = float(score_predictions(default_predictions[np.newaxis], labels)[0])
+
+    print("\n" + "-" * 60)
+    print(f"Default thresholds: balanced accuracy {default_score:.3f}")
+    print(f"Best thresholds:    balanced accuracy {best_score:.3f}")
+    print("-" * 60)
+    default_recall = per_gesture_recall(default_predictions, labels)
+    for gesture, recall in per_gesture_recall(best_predictions, labels).items():
+        print(f"{gesture:<15} {default_recall[gesture]:.3f} -> {recall:.3f}")
+
+    # Extra keys are ignored by loadTrainedThresholds, like the trainer's _samples
+    output = {
+        **best,
+        "_search": {
+            "mode": args.mode,
+            "candidates": total,
+            "frames": int(len(labels)),
+            "balancedAccuracy": round(best_score, 4),
+        },
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+
+    print(f"\n✓ Saved best thresholds to {args.output}")
+    print("Load them on the board from the browser console with:")
+    print(f"  localStorage.setItem('gesture-thresholds', JSON.stringify({json.dumps(best)}))")
+
+
+if __name__ == "__main__":
+    main()